@@ -29,9 +29,9 @@ def main():
         client = SupabaseClient()
         print()
 
-        # 创建 source_configs 表
+        # 定义三个表的结构，合并为一次 SQL 往返创建
         print("1. 创建数据源配置表 (source_configs)...")
-        client.create_table("source_configs", [
+        source_configs_columns = [
             {"name": "id", "type": "UUID", "isPrimaryKey": True},
             {"name": "user_id", "type": "UUID", "isNullable": False},
             {"name": "type", "type": "VARCHAR(20)", "isNullable": False},
@@ -47,12 +47,11 @@ def main():
             {"name": "error_count", "type": "INTEGER", "defaultValue": "0"},
             {"name": "created_at", "type": "TIMESTAMP", "defaultValue": "now()"},
             {"name": "updated_at", "type": "TIMESTAMP", "defaultValue": "now()"}
-        ])
-        print()
+        ]
 
-        # 创建 monitor_jobs 表
+        # 监控任务记录表
         print("2. 创建监控任务记录表 (monitor_jobs)...")
-        client.create_table("monitor_jobs", [
+        monitor_jobs_columns = [
             {"name": "id", "type": "UUID", "isPrimaryKey": True},
             {"name": "source_config_id", "type": "UUID", "isNullable": False},
             {"name": "status", "type": "VARCHAR(20)", "defaultValue": "'pending'"},
@@ -64,12 +63,11 @@ def main():
             {"name": "started_at", "type": "TIMESTAMP", "isNullable": True},
             {"name": "completed_at", "type": "TIMESTAMP", "isNullable": True},
             {"name": "created_at", "type": "TIMESTAMP", "defaultValue": "now()"}
-        ])
-        print()
+        ]
 
-        # 创建 push_logs 表
+        # 推送记录表
         print("3. 创建推送记录表 (push_logs)...")
-        client.create_table("push_logs", [
+        push_logs_columns = [
             {"name": "id", "type": "UUID", "isPrimaryKey": True},
             {"name": "user_id", "type": "UUID", "isNullable": False},
             {"name": "monitor_job_id", "type": "UUID", "isNullable": True},
@@ -82,6 +80,14 @@ def main():
             {"name": "sent_at", "type": "TIMESTAMP", "isNullable": True},
             {"name": "error_message", "type": "TEXT", "isNullable": True},
             {"name": "created_at", "type": "TIMESTAMP", "defaultValue": "now()"}
+        ]
+        print()
+
+        # 一次性创建三个表 (单个事务 + 单次 schema cache 等待)
+        client.create_tables([
+            ("source_configs", source_configs_columns),
+            ("monitor_jobs", monitor_jobs_columns),
+            ("push_logs", push_logs_columns),
         ])
         print()
 
@@ -5,12 +5,39 @@ Supabase 客户端 - 用于与自部署的 Supabase 实例交互
 """
 
 import os
+import re
 import sys
-import json
-import csv
+import time
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Dict, List, Any, Union
-from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    # 可选依赖：缺失时回退到标准库 json
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    # 可选依赖：缺失时回退到 requests 连接池
+    httpx = None
+
+if httpx is not None:
+    _HTTP_ERRORS = (requests.exceptions.RequestException, httpx.HTTPError)
+else:
+    _HTTP_ERRORS = (requests.exceptions.RequestException,)
+
+# 判断 CSV 单元格是否为数字；预编译的 C 正则比链式 replace().isdigit() 更快且无临时字符串
+_NUM_RE = re.compile(r'-?\d+(?:\.\d+)?').fullmatch
+
+# CRUD 热路径的进度信息走 DEBUG 日志，未开启时零开销；
+# 需要旧的逐条输出时执行 logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger("supabase_client")
 
 
 class SupabaseClient:
@@ -19,7 +46,9 @@ class SupabaseClient:
     def __init__(
         self,
         url: Optional[str] = None,
-        service_role_key: Optional[str] = None
+        service_role_key: Optional[str] = None,
+        cache_wait_timeout: float = 10.0,
+        verbose: bool = True
     ):
         """
         初始化 Supabase 客户端
@@ -27,6 +56,8 @@ class SupabaseClient:
         Args:
             url: Supabase URL (可选，默认使用预配置的 URL)
             service_role_key: Service Role Key (可选，默认使用预配置的 Key)
+            cache_wait_timeout: DDL 后等待 PostgREST schema cache 刷新的最长秒数
+            verbose: 是否在初始化时打印连接信息
 
         优先级: 用户提供的参数 > 环境变量 > 预配置默认值
         """
@@ -37,6 +68,7 @@ class SupabaseClient:
         # 按优先级获取配置
         self.url = url or os.getenv("NEXT_PUBLIC_SUPABASE_URL") or DEFAULT_URL
         self.key = service_role_key or os.getenv("SUPABASE_SERVICE_ROLE_KEY") or DEFAULT_KEY
+        self.cache_wait_timeout = cache_wait_timeout
 
         # 移除 URL 末尾的斜杠，避免拼接时出现双斜杠
         self.url = self.url.rstrip("/")
@@ -46,14 +78,99 @@ class SupabaseClient:
             "apikey": self.key,
             "Authorization": f"Bearer {self.key}",
             "Content-Type": "application/json",
+            "Accept-Encoding": "gzip",
             "Prefer": "return=representation"
         }
 
+        # 预生成常用请求头变体，避免每次 CRUD 调用都复制/构造字典
+        self.headers_representation = {**self.headers, "Prefer": "return=representation"}
+        self.headers_minimal = {**self.headers, "Prefer": "return=minimal"}
+        self.headers_count = {
+            "apikey": self.key,
+            "Authorization": f"Bearer {self.key}",
+            "Prefer": "count=exact"
+        }
+
         # PostgreSQL Meta API 端点
         self.meta_api_url = f"{self.url}/pg"
 
-        print(f"✅ Supabase 客户端已初始化")
-        print(f"   URL: {self.url}")
+        # HTTP 传输层：优先使用 httpx (HTTP/2 多路复用，所有并发请求共享
+        # 一条 TLS 连接)，未安装 httpx/h2 时回退到 requests 的连接池 Session。
+        # 两者的 get/post/patch/delete/head/request 接口兼容。
+        self.session = None
+        if httpx is not None:
+            try:
+                self.session = httpx.Client(
+                    http2=True,
+                    headers=self.headers,
+                    timeout=30.0,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+                )
+            except ImportError:
+                # httpx 装了但缺少 h2，走 requests 回退
+                self.session = None
+
+        if self.session is None:
+            # 复用连接池的 Session，避免每次请求重新建立 TCP+TLS 连接
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            adapter = HTTPAdapter(
+                pool_connections=8,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=[429, 502, 503, 504]
+                )
+            )
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+
+        # 表元数据的进程内 TTL 缓存，避免重复的 meta API 往返
+        self._meta_cache: Dict[tuple, tuple] = {}
+
+        if verbose:
+            print(f"✅ Supabase 客户端已初始化")
+            print(f"   URL: {self.url}")
+
+    @staticmethod
+    def _parse(response):
+        """解析响应 JSON (优先使用 orjson，大响应体快数倍)"""
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    def _cached(self, key: tuple, ttl: float, fn):
+        """
+        按 TTL 缓存 fn() 的结果
+
+        Args:
+            key: 缓存键
+            ttl: 缓存有效期 (秒)
+            fn: 未命中时执行的无参函数
+        """
+        now = time.monotonic()
+        hit = self._meta_cache.get(key)
+        if hit is not None and now - hit[0] < ttl:
+            return hit[1]
+
+        value = fn()
+        self._meta_cache[key] = (now, value)
+        return value
+
+    def invalidate_schema_cache(self):
+        """清空元数据缓存 (DDL 操作后自动调用)"""
+        self._meta_cache.clear()
+
+    def close(self):
+        """关闭底层连接池"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def _request(
         self,
@@ -76,25 +193,18 @@ class SupabaseClient:
         """
         url = f"{self.url}{endpoint}"
 
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            elif method.upper() == "POST":
-                response = requests.post(url, headers=self.headers, json=data, params=params, timeout=30)
-            elif method.upper() == "PATCH":
-                response = requests.patch(url, headers=self.headers, json=data, params=params, timeout=30)
-            elif method.upper() == "DELETE":
-                response = requests.delete(url, headers=self.headers, params=params, timeout=30)
-            else:
-                raise ValueError(f"不支持的 HTTP 方法: {method}")
+        if method.upper() not in ("GET", "POST", "PATCH", "DELETE"):
+            raise ValueError(f"不支持的 HTTP 方法: {method}")
 
+        try:
+            response = self.session.request(method.upper(), url, json=data, params=params, timeout=30)
             response.raise_for_status()
-            return response.json()
+            return self._parse(response)
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 请求失败: {e}")
+        except _HTTP_ERRORS as e:
+            log.error(f"请求失败: {e}")
             if hasattr(e, 'response') and e.response is not None:
-                print(f"   响应内容: {e.response.text}")
+                log.error(f"响应内容: {e.response.text}")
             raise
 
     # ==================== 表管理 ====================
@@ -134,92 +244,189 @@ class SupabaseClient:
         """
         # 使用直接 SQL 执行而不是 postgres-meta API
         # 因为 postgres-meta API 的 /tables 端点有时不能正确创建字段
+        sql = self._build_create_table_sql(table_name, columns, schema)
+
+        print(f"🔧 正在创建表 '{table_name}'...")
 
-        # 构建 SQL 语句
+        # 使用 postgres-meta 的 query 端点执行 SQL
+        response = self.session.post(
+            f"{self.meta_api_url}/query",
+            headers=self.headers,
+            json={"query": sql}
+        )
+        response.raise_for_status()
+
+        print(f"✅ 表 '{table_name}' 创建成功")
+
+        self.invalidate_schema_cache()
+
+        # 主动触发并等待 PostgREST 刷新 schema cache
+        self._refresh_schema_cache([table_name])
+
+        return {"table_name": table_name, "columns": columns}
+
+    def _refresh_schema_cache(self, table_names: List[str]):
+        """
+        通知 PostgREST 重新加载 schema cache，并轮询等待新表可用
+
+        通过 NOTIFY 立即触发刷新，然后对每个表轮询 REST 端点，
+        一旦返回非 404 就继续，避免固定 sleep 造成的空等。
+        """
+        print("⏳ 等待 PostgREST 刷新 schema cache...")
+        self.session.post(
+            f"{self.meta_api_url}/query",
+            headers=self.headers,
+            json={"query": "NOTIFY pgrst, 'reload schema';"}
+        )
+
+        deadline = time.monotonic() + self.cache_wait_timeout
+        for table_name in table_names:
+            while time.monotonic() < deadline:
+                response = self.session.head(
+                    f"{self.url}/rest/v1/{table_name}",
+                    headers=self.headers,
+                    params={"select": "*", "limit": 0},
+                    timeout=5
+                )
+                if response.status_code != 404:
+                    break
+                time.sleep(0.1)
+
+    @staticmethod
+    def _identity_sql(col_type: str) -> str:
+        """返回自增列对应的 SQL 片段 (SERIAL / BIGSERIAL / IDENTITY)"""
+        col_type = col_type.lower()
+        if col_type in ("integer", "int"):
+            return "SERIAL"
+        if col_type in ("bigint", "big integer"):
+            return "BIGSERIAL"
+        return "GENERATED BY DEFAULT AS IDENTITY"
+
+    def _build_create_table_sql(
+        self,
+        table_name: str,
+        columns: List[Dict[str, Any]],
+        schema: str = "public"
+    ) -> str:
+        """构建 CREATE TABLE 语句"""
         column_defs = []
         for col in columns:
-            col_def = f'    "{col["name"]}" {col["type"].upper()}'
+            parts = [f'"{col["name"]}" {col["type"].upper()}']
 
             # 添加约束
             if col.get("isPrimaryKey"):
-                col_def += " PRIMARY KEY"
+                parts.append("PRIMARY KEY")
 
             if col.get("isIdentity"):
-                # 对于 PostgreSQL，使用 SERIAL 或 BIGSERIAL
-                if col["type"].lower() in ["integer", "int"]:
-                    col_def = f'    "{col["name"]}" SERIAL PRIMARY KEY'
-                elif col["type"].lower() in ["bigint", "big integer"]:
-                    col_def = f'    "{col["name"]}" BIGSERIAL PRIMARY KEY'
+                identity = self._identity_sql(col["type"])
+                if identity.endswith("SERIAL"):
+                    # SERIAL/BIGSERIAL 自带类型，替换整个列定义
+                    parts = [f'"{col["name"]}" {identity} PRIMARY KEY']
                 else:
-                    col_def += " GENERATED BY DEFAULT AS IDENTITY"
+                    parts.append(identity)
 
             if not col.get("isNullable", False) and not col.get("isPrimaryKey"):
-                col_def += " NOT NULL"
+                parts.append("NOT NULL")
 
             if col.get("defaultValue"):
                 default_val = col["defaultValue"]
                 # 处理特殊的默认值
                 if default_val == "now()":
-                    col_def += " DEFAULT NOW()"
+                    parts.append("DEFAULT NOW()")
                 elif isinstance(default_val, str) and not default_val.isdigit():
-                    col_def += f" DEFAULT '{default_val}'"
+                    parts.append(f"DEFAULT '{default_val}'")
                 else:
-                    col_def += f" DEFAULT {default_val}"
+                    parts.append(f"DEFAULT {default_val}")
 
-            column_defs.append(col_def)
+            column_defs.append("    " + " ".join(parts))
 
         # 构建完整的 CREATE TABLE 语句
         full_table_name = f'"{schema}"."{table_name}"' if schema != "public" else f'"{table_name}"'
-        sql = f"CREATE TABLE {full_table_name} (\n" + ",\n".join(column_defs) + "\n);"
+        return f"CREATE TABLE {full_table_name} (\n" + ",\n".join(column_defs) + "\n);"
 
-        print(f"🔧 正在创建表 '{table_name}'...")
+    def create_tables(
+        self,
+        specs: List[tuple],
+        schema: str = "public"
+    ) -> List[Dict]:
+        """
+        批量创建数据库表 (单次 SQL 往返)
 
-        # 使用 postgres-meta 的 query 端点执行 SQL
-        response = requests.post(
+        将多条 CREATE TABLE 语句合并为一个事务、一次 HTTP 请求提交，
+        避免逐表创建时的多次往返和多次 schema cache 等待。
+
+        Args:
+            specs: (table_name, columns) 元组列表，columns 格式同 create_table
+            schema: 模式名 (默认为 public)
+
+        Returns:
+            创建的表信息列表
+        """
+        statements = [
+            self._build_create_table_sql(table_name, columns, schema)
+            for table_name, columns in specs
+        ]
+        # 包在事务中，失败时回滚已创建的表
+        sql = "BEGIN;\n" + "\n".join(statements) + "\nCOMMIT;"
+
+        print(f"🔧 正在创建 {len(specs)} 个表...")
+
+        response = self.session.post(
             f"{self.meta_api_url}/query",
             headers=self.headers,
             json={"query": sql}
         )
         response.raise_for_status()
 
-        print(f"✅ 表 '{table_name}' 创建成功")
+        for table_name, _ in specs:
+            print(f"✅ 表 '{table_name}' 创建成功")
 
-        # 等待 PostgREST 刷新 schema cache
-        print("⏳ 等待 PostgREST 刷新 schema cache...")
-        import time
-        time.sleep(3)
+        self.invalidate_schema_cache()
 
-        return {"table_name": table_name, "columns": columns}
+        # 主动触发并等待 PostgREST 刷新 schema cache (全部表只等一次)
+        self._refresh_schema_cache([table_name for table_name, _ in specs])
+
+        return [
+            {"table_name": table_name, "columns": columns}
+            for table_name, columns in specs
+        ]
 
     def list_tables(self, schema: str = "public") -> List[Dict]:
-        """列出所有表"""
-        response = requests.get(
-            f"{self.meta_api_url}/tables",
-            headers=self.headers,
-            params={"schema": schema}
-        )
-        response.raise_for_status()
-        return response.json()
+        """列出所有表 (结果缓存 30 秒)"""
+        def fetch():
+            response = self.session.get(
+                f"{self.meta_api_url}/tables",
+                headers=self.headers,
+                params={"schema": schema}
+            )
+            response.raise_for_status()
+            return self._parse(response)
+
+        return self._cached(("list_tables", schema), 30, fetch)
 
     def get_table_info(self, table_name: str, schema: str = "public") -> Dict:
-        """获取表详细信息"""
-        response = requests.get(
-            f"{self.meta_api_url}/tables/{schema}.{table_name}",
-            headers=self.headers
-        )
-        response.raise_for_status()
-        return response.json()
+        """获取表详细信息 (结果缓存 30 秒)"""
+        def fetch():
+            response = self.session.get(
+                f"{self.meta_api_url}/tables/{schema}.{table_name}",
+                headers=self.headers
+            )
+            response.raise_for_status()
+            return self._parse(response)
+
+        return self._cached(("table_info", schema, table_name), 30, fetch)
 
     def drop_table(self, table_name: str, schema: str = "public", cascade: bool = False) -> Dict:
         """删除表"""
-        response = requests.delete(
+        response = self.session.delete(
             f"{self.meta_api_url}/tables/{schema}.{table_name}",
             headers=self.headers,
             params={"cascade": cascade}
         )
         response.raise_for_status()
+        self.invalidate_schema_cache()
         print(f"✅ 表 '{table_name}' 删除成功")
-        return response.json()
+        return self._parse(response)
 
     def add_column(
         self,
@@ -235,14 +442,15 @@ class SupabaseClient:
             column: 列定义 (格式同 create_table 的 columns)
             schema: 模式名
         """
-        response = requests.post(
+        response = self.session.post(
             f"{self.meta_api_url}/tables/{schema}.{table_name}/columns",
             headers=self.headers,
             json=column
         )
         response.raise_for_status()
+        self.invalidate_schema_cache()
         print(f"✅ 列 '{column['name']}' 添加到表 '{table_name}'")
-        return response.json()
+        return self._parse(response)
 
     def alter_column(
         self,
@@ -260,14 +468,15 @@ class SupabaseClient:
             alterations: 要修改的字段，如 {"nullable": False, "default": "0"}
             schema: 模式名
         """
-        response = requests.patch(
+        response = self.session.patch(
             f"{self.meta_api_url}/tables/{schema}.{table_name}/columns/{column_name}",
             headers=self.headers,
             json=alterations
         )
         response.raise_for_status()
+        self.invalidate_schema_cache()
         print(f"✅ 列 '{column_name}' 修改成功")
-        return response.json()
+        return self._parse(response)
 
     def drop_column(
         self,
@@ -276,13 +485,14 @@ class SupabaseClient:
         schema: str = "public"
     ) -> Dict:
         """删除列"""
-        response = requests.delete(
+        response = self.session.delete(
             f"{self.meta_api_url}/tables/{schema}.{table_name}/columns/{column_name}",
             headers=self.headers
         )
         response.raise_for_status()
+        self.invalidate_schema_cache()
         print(f"✅ 列 '{column_name}' 删除成功")
-        return response.json()
+        return self._parse(response)
 
     # ==================== 数据 CRUD ====================
 
@@ -290,7 +500,10 @@ class SupabaseClient:
         self,
         table_name: str,
         data: Union[Dict, List[Dict]],
-        schema: str = "public"
+        schema: str = "public",
+        return_rows: bool = True,
+        on_conflict: Optional[str] = None,
+        raw_body: Optional[bytes] = None
     ) -> List[Dict]:
         """
         插入数据
@@ -299,26 +512,50 @@ class SupabaseClient:
             table_name: 表名
             data: 要插入的数据 (单条记录或记录列表)
             schema: 模式名
+            return_rows: 是否让服务端返回插入的记录；批量导入只需要计数时
+                置 False (Prefer: return=minimal)，可省掉响应体的传输
+            on_conflict: 冲突判定列 (逗号分隔)；设置后按 merge-duplicates
+                执行 upsert，使导入可以幂等重跑
+            raw_body: 预先序列化好的 JSON 请求体；提供时直接发送，跳过
+                HTTP 库内部的 json.dumps (并发导入用 orjson 预序列化)
 
         Returns:
-            插入的记录
+            插入的记录 (return_rows=False 时返回空列表)
         """
         endpoint = f"/rest/v1/{table_name}"
-        headers = self.headers.copy()
-        headers["Prefer"] = "return=representation"
 
-        is_single = not isinstance(data, list)
-        payload = data if is_single else data
+        if on_conflict:
+            headers = self.headers.copy()
+            headers["Prefer"] = "resolution=merge-duplicates," + (
+                "return=representation" if return_rows else "return=minimal"
+            )
+            params = {"on_conflict": on_conflict}
+        else:
+            headers = self.headers_representation if return_rows else self.headers_minimal
+            params = None
 
+        # PostgREST 同时接受单条对象和对象数组，直接透传即可
         url = f"{self.url}{endpoint}"
-        response = requests.post(url, headers=headers, json=payload)
+        if raw_body is not None:
+            if isinstance(self.session, requests.Session):
+                response = self.session.post(url, headers=headers, data=raw_body, params=params)
+            else:
+                # httpx 传原始字节要用 content=，data= 已废弃
+                response = self.session.post(url, headers=headers, content=raw_body, params=params)
+        else:
+            response = self.session.post(url, headers=headers, json=data, params=params)
         response.raise_for_status()
 
-        result = response.json()
-        if is_single:
+        if not return_rows:
+            count = len(data) if isinstance(data, list) else 1
+            log.debug(f"插入 {count} 条记录到 '{table_name}'")
+            return []
+
+        result = self._parse(response)
+        if not isinstance(result, list):
             result = [result]
 
-        print(f"✅ 插入 {len(result)} 条记录到 '{table_name}'")
+        log.debug(f"插入 {len(result)} 条记录到 '{table_name}'")
         return result
 
     def select(
@@ -373,13 +610,60 @@ class SupabaseClient:
             params["offset"] = offset
 
         url = f"{self.url}{endpoint}"
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, headers=self.headers, params=params)
         response.raise_for_status()
 
-        result = response.json()
-        print(f"✅ 查询到 {len(result)} 条记录")
+        result = self._parse(response)
+        log.debug(f"查询到 {len(result)} 条记录")
         return result
 
+    def iter_rows(
+        self,
+        table_name: str,
+        key_column: str = "id",
+        page_size: int = 10000,
+        filters: Optional[Dict[str, Any]] = None,
+        schema: str = "public"
+    ):
+        """
+        按键集 (keyset) 分页逐页迭代表数据
+
+        用 key_column 上的 `gt.<上一页末尾值>` 翻页，服务端每页只需一次
+        索引定位；limit/offset 分页的扫描代价则随偏移量线性增长，
+        大表导出时差距是数量级的。
+
+        Args:
+            table_name: 表名
+            key_column: 用于翻页的有序唯一列 (通常是主键)
+            page_size: 每页行数
+            filters: 额外过滤条件
+            schema: 模式名
+
+        Yields:
+            每页的记录列表
+        """
+        last_key = None
+        while True:
+            page_filters = dict(filters) if filters else {}
+            if last_key is not None:
+                page_filters[key_column] = f"gt.{last_key}"
+
+            rows = self.select(
+                table_name,
+                filters=page_filters,
+                order=f"{key_column}.asc",
+                limit=page_size,
+                schema=schema
+            )
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][key_column]
+
     def update(
         self,
         table_name: str,
@@ -400,8 +684,7 @@ class SupabaseClient:
             更新的记录
         """
         endpoint = f"/rest/v1/{table_name}"
-        headers = self.headers.copy()
-        headers["Prefer"] = "return=representation"
+        headers = self.headers_representation
 
         # 将 filters 转为查询参数
         params = {}
@@ -409,11 +692,11 @@ class SupabaseClient:
             params[key] = value
 
         url = f"{self.url}{endpoint}"
-        response = requests.patch(url, headers=headers, json=data, params=params)
+        response = self.session.patch(url, headers=headers, json=data, params=params)
         response.raise_for_status()
 
-        result = response.json()
-        print(f"✅ 更新了 {len(result)} 条记录")
+        result = self._parse(response)
+        log.debug(f"更新了 {len(result)} 条记录")
         return result
 
     def delete(
@@ -434,8 +717,7 @@ class SupabaseClient:
             删除的记录
         """
         endpoint = f"/rest/v1/{table_name}"
-        headers = self.headers.copy()
-        headers["Prefer"] = "return=representation"
+        headers = self.headers_representation
 
         # 将 filters 转为查询参数
         params = {}
@@ -443,11 +725,11 @@ class SupabaseClient:
             params[key] = value
 
         url = f"{self.url}{endpoint}"
-        response = requests.delete(url, headers=headers, params=params)
+        response = self.session.delete(url, headers=headers, params=params)
         response.raise_for_status()
 
-        result = response.json()
-        print(f"✅ 删除了 {len(result)} 条记录")
+        result = self._parse(response)
+        log.debug(f"删除了 {len(result)} 条记录")
         return result
 
     def count(
@@ -470,11 +752,6 @@ class SupabaseClient:
             记录数
         """
         endpoint = f"/rest/v1/{table_name}"
-        headers = {
-            "apikey": self.key,
-            "Authorization": f"Bearer {self.key}",
-            "Prefer": "count=exact"
-        }
 
         params = {}
         if filters:
@@ -482,11 +759,21 @@ class SupabaseClient:
                 params[key] = value
 
         url = f"{self.url}{endpoint}"
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
+        # HEAD 只返回响应头，不把表的所有行作为响应体传回来
+        headers = {**self.headers_count, "Range-Unit": "items", "Range": "0-0"}
+        response = self.session.head(url, headers=headers, params=params)
+        content_range = response.headers.get("Content-Range")
+
+        if response.status_code >= 400 or not content_range:
+            # 个别部署不接受 HEAD，退回 limit=0 的 GET (响应体为空数组)
+            response = self.session.get(
+                url, headers=self.headers_count, params={**params, "limit": 0}
+            )
+            response.raise_for_status()
+            content_range = response.headers.get("Content-Range", "0/0")
 
-        count = int(response.headers.get("Content-Range", "0").split("/")[1])
-        print(f"✅ 表 '{table_name}' 中有 {count} 条记录")
+        count = int(content_range.split("/")[1])
+        log.debug(f"表 '{table_name}' 中有 {count} 条记录")
         return count
 
     # ==================== SQL 查询 ====================
@@ -506,7 +793,7 @@ class SupabaseClient:
         """
         endpoint = "/rest/v1/rpc/exec_sql"
         url = f"{self.url}{endpoint}"
-        response = requests.post(
+        response = self.session.post(
             url,
             headers=self.headers,
             json={"query": sql}
@@ -529,8 +816,8 @@ class SupabaseClient:
             response.raise_for_status()
 
         response.raise_for_status()
-        result = response.json()
-        print(f"✅ SQL 查询执行成功，返回 {len(result)} 条记录")
+        result = self._parse(response)
+        log.debug(f"SQL 查询执行成功，返回 {len(result)} 条记录")
         return result
 
     # ==================== 数据导入导出 ====================
@@ -540,43 +827,220 @@ class SupabaseClient:
         table_name: str,
         output_file: str,
         filters: Optional[Dict[str, Any]] = None,
-        schema: str = "public"
+        schema: str = "public",
+        batch_size: int = 10000,
+        key_column: str = "id"
     ) -> int:
         """
-        导出数据到 CSV 文件
+        导出数据到 CSV 文件 (键集分页流式写入)
+
+        逐页查询并边查边写，内存占用与 batch_size 成正比而不是与表大小成正比。
 
         Args:
             table_name: 表名
             output_file: 输出文件路径
             filters: 过滤条件
             schema: 模式名
+            batch_size: 每页查询/写入的行数
+            key_column: 用于键集分页的有序唯一列
 
         Returns:
             导出的记录数
         """
-        data = self.select(table_name, filters=filters, schema=schema)
+        import csv
 
-        if not data:
+        total = 0
+        writer = None
+
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            for rows in self.iter_rows(
+                table_name, key_column=key_column,
+                page_size=batch_size, filters=filters, schema=schema
+            ):
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                    writer.writeheader()
+
+                writer.writerows(rows)
+                total += len(rows)
+
+        if not total:
             print(f"⚠️  表 '{table_name}' 中没有数据")
             return 0
 
-        # 获取所有字段
-        fieldnames = list(data[0].keys())
+        print(f"✅ 导出 {total} 条记录到 '{output_file}'")
+        return total
 
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+    def _insert_batches(
+        self,
+        table_name: str,
+        batches: List[List[Dict]],
+        schema: str = "public",
+        concurrency: int = 4,
+        on_conflict: Optional[str] = None
+    ) -> int:
+        """
+        并发执行批量插入
+
+        用有界线程池让多个批次同时在途，导入吞吐不再受单次往返延迟限制
+        (连接由 Session 连接池复用，pool_maxsize 需不小于 concurrency)。
+        导入只需要计数，统一走 return=minimal，省掉服务端回传插入结果。
+        失败的批次打印错误并继续，不中断整个导入。
+
+        Args:
+            table_name: 表名
+            batches: 批次列表，每批是一组记录
+            schema: 模式名
+            concurrency: 同时在途的批次数
+            on_conflict: 冲突判定列，透传给 insert 实现幂等 upsert
+
+        Returns:
+            成功插入的记录数
+        """
+        total = 0
+
+        # 提交前用 orjson 一次性序列化各批次请求体，
+        # 避免每个工作线程在 HTTP 库内部重复执行标准库 json.dumps
+        if orjson is not None:
+            bodies = [orjson.dumps(batch, default=str) for batch in batches]
+        else:
+            bodies = [None] * len(batches)
+
+        if concurrency <= 1 or len(batches) <= 1:
+            for batch, body in zip(batches, bodies):
+                self.insert(table_name, batch, schema=schema,
+                            return_rows=False, on_conflict=on_conflict,
+                            raw_body=body)
+                total += len(batch)
+            return total
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(
+                    self.insert, table_name, batch, schema=schema,
+                    return_rows=False, on_conflict=on_conflict,
+                    raw_body=bodies[i]
+                ): i
+                for i, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    future.result()
+                    total += len(batches[index])
+                except Exception as e:
+                    log.error(f"第 {index + 1} 批插入失败: {e}")
+
+        return total
+
+    def _load_csv_records(self, input_file: str) -> List[Dict]:
+        """
+        读取 CSV 为记录列表
+
+        优先使用 pandas：C 实现的 CSV 解析器 + 向量化类型推断，
+        比逐行逐列的纯 Python 转换快得多；未安装时回退到
+        csv.DictReader 加逐格数字转换。
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            pd = None
+
+        if pd is not None:
+            try:
+                df = pd.read_csv(input_file)
+            except pd.errors.EmptyDataError:
+                # 与 csv.DictReader 路径保持一致：空文件返回空列表而不是抛异常
+                return []
+            # NaN 转为 None，插入时序列化为 null
+            df = df.astype(object).where(df.notnull(), None)
+            return df.to_dict("records")
+
+        import csv
+
+        records = []
+        with open(input_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                converted_row = {}
+                for key, value in row.items():
+                    # 尝试转换为数字
+                    if value and _NUM_RE(value):
+                        converted_row[key] = float(value) if '.' in value else int(value)
+                    else:
+                        converted_row[key] = value
+                records.append(converted_row)
+        return records
+
+    def copy_from_csv(
+        self,
+        table_name: str,
+        input_file: str,
+        columns: Optional[List[str]] = None,
+        schema: str = "public"
+    ) -> int:
+        """
+        用单条 SQL 语句在服务端批量导入 CSV
+
+        postgres-meta 的 /query 端点不支持 COPY ... FROM STDIN 的流式
+        输入，因此把整个文件序列化为一个 JSON 数组字面量，在服务端用
+        json_populate_recordset 展开成行 —— 整个导入只有一次 HTTP 往返，
+        绕开 PostgREST 的逐批插入路径。
+
+        Args:
+            table_name: 表名
+            input_file: 输入文件路径
+            columns: 要导入的列 (默认取 CSV 表头的全部列)
+            schema: 模式名
+
+        Returns:
+            导入的记录数
+        """
+        records = self._load_csv_records(input_file)
+        if not records:
+            print(f"⚠️  CSV 文件 '{input_file}' 中没有数据")
+            return 0
+
+        if columns is None:
+            columns = list(records[0].keys())
+        col_list = ", ".join(f'"{col}"' for col in columns)
+
+        if orjson is not None:
+            payload = orjson.dumps(records, default=str).decode("utf-8")
+        else:
+            import json
+            payload = json.dumps(records, ensure_ascii=False, default=str)
 
-        print(f"✅ 导出 {len(data)} 条记录到 '{output_file}'")
-        return len(data)
+        # SQL 字符串字面量中的单引号成对转义
+        payload = payload.replace("'", "''")
+
+        full_table_name = f'"{schema}"."{table_name}"' if schema != "public" else f'"{table_name}"'
+        sql = (
+            f"INSERT INTO {full_table_name} ({col_list}) "
+            f"SELECT {col_list} FROM json_populate_recordset(NULL::{full_table_name}, '{payload}');"
+        )
+
+        response = self.session.post(
+            f"{self.meta_api_url}/query",
+            headers=self.headers,
+            json={"query": sql}
+        )
+        response.raise_for_status()
+
+        print(f"✅ 从 '{input_file}' 单语句导入 {len(records)} 条记录")
+        return len(records)
+
+    # 超过该大小的 CSV 默认走 copy_from_csv 的单语句导入
+    copy_threshold_bytes = 4 * 1024 * 1024
 
     def import_from_csv(
         self,
         table_name: str,
         input_file: str,
         schema: str = "public",
-        batch_size: int = 1000
+        batch_size: int = 1000,
+        concurrency: int = 4,
+        on_conflict: Optional[str] = None,
+        use_copy: Optional[bool] = None
     ) -> int:
         """
         从 CSV 文件导入数据
@@ -586,36 +1050,34 @@ class SupabaseClient:
             input_file: 输入文件路径
             schema: 模式名
             batch_size: 批量插入大小
+            concurrency: 并发插入的批次数
+            on_conflict: 冲突判定列 (逗号分隔)，设置后导入可幂等重跑
+            use_copy: 是否走 copy_from_csv 的单语句导入；默认按文件大小
+                自动选择 (超过 copy_threshold_bytes 时启用)
 
         Returns:
             导入的记录数
         """
-        with open(input_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            data = list(reader)
+        if use_copy is None:
+            use_copy = (
+                on_conflict is None
+                and os.path.getsize(input_file) >= self.copy_threshold_bytes
+            )
+        if use_copy:
+            return self.copy_from_csv(table_name, input_file, schema=schema)
+
+        data = self._load_csv_records(input_file)
 
         if not data:
             print(f"⚠️  CSV 文件 '{input_file}' 中没有数据")
             return 0
 
-        # 批量插入
-        total = 0
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            # 将字符串值转换为适当类型
-            converted_batch = []
-            for row in batch:
-                converted_row = {}
-                for key, value in row.items():
-                    # 尝试转换为数字
-                    if value and value.replace('.', '', 1).replace('-', '', 1).isdigit():
-                        converted_row[key] = float(value) if '.' in value else int(value)
-                    else:
-                        converted_row[key] = value
-                converted_batch.append(converted_row)
-
-            self.insert(table_name, converted_batch, schema=schema)
-            total += len(converted_batch)
+        # 切分批次后并发插入
+        batches = [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+        total = self._insert_batches(
+            table_name, batches, schema=schema,
+            concurrency=concurrency, on_conflict=on_conflict
+        )
 
         print(f"✅ 从 '{input_file}' 导入 {total} 条记录")
         return total
@@ -625,34 +1087,59 @@ class SupabaseClient:
         table_name: str,
         output_file: str,
         filters: Optional[Dict[str, Any]] = None,
-        schema: str = "public"
+        schema: str = "public",
+        batch_size: int = 10000,
+        key_column: str = "id"
     ) -> int:
         """
-        导出数据到 JSON 文件
+        导出数据到 JSON 文件 (键集分页流式写入)
+
+        逐页查询并逐条序列化，内存占用从 O(表大小) 降为 O(batch_size)；
+        安装了 orjson 时使用其原生序列化器加速。
 
         Args:
             table_name: 表名
             output_file: 输出文件路径
             filters: 过滤条件
             schema: 模式名
+            batch_size: 每页查询/写入的行数
+            key_column: 用于键集分页的有序唯一列
 
         Returns:
             导出的记录数
         """
-        data = self.select(table_name, filters=filters, schema=schema)
+        if orjson is not None:
+            dumps = lambda row: orjson.dumps(row, default=str)
+        else:
+            import json
+            dumps = lambda row: json.dumps(row, ensure_ascii=False, default=str).encode("utf-8")
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        total = 0
 
-        print(f"✅ 导出 {len(data)} 条记录到 '{output_file}'")
-        return len(data)
+        with open(output_file, 'wb') as f:
+            f.write(b"[\n")
+            for rows in self.iter_rows(
+                table_name, key_column=key_column,
+                page_size=batch_size, filters=filters, schema=schema
+            ):
+                for row in rows:
+                    if total:
+                        f.write(b",\n")
+                    f.write(dumps(row))
+                    total += 1
+            f.write(b"\n]")
+
+        print(f"✅ 导出 {total} 条记录到 '{output_file}'")
+        return total
 
     def import_from_json(
         self,
         table_name: str,
         input_file: str,
         schema: str = "public",
-        batch_size: int = 1000
+        batch_size: int = 1000,
+        concurrency: int = 4,
+        on_conflict: Optional[str] = None
     ) -> int:
         """
         从 JSON 文件导入数据
@@ -662,10 +1149,14 @@ class SupabaseClient:
             input_file: 输入文件路径
             schema: 模式名
             batch_size: 批量插入大小
+            concurrency: 并发插入的批次数
+            on_conflict: 冲突判定列 (逗号分隔)，设置后导入可幂等重跑
 
         Returns:
             导入的记录数
         """
+        import json
+
         with open(input_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
@@ -676,12 +1167,12 @@ class SupabaseClient:
             print(f"⚠️  JSON 文件 '{input_file}' 中没有数据")
             return 0
 
-        # 批量插入
-        total = 0
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            self.insert(table_name, batch, schema=schema)
-            total += len(batch)
+        # 并发批量插入
+        batches = [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+        total = self._insert_batches(
+            table_name, batches, schema=schema,
+            concurrency=concurrency, on_conflict=on_conflict
+        )
 
         print(f"✅ 从 '{input_file}' 导入 {total} 条记录")
         return total
@@ -690,6 +1181,7 @@ class SupabaseClient:
 def main():
     """命令行接口"""
     import argparse
+    import json
 
     parser = argparse.ArgumentParser(description="Supabase 客户端命令行工具")
     subparsers = parser.add_subparsers(dest="command", help="可用命令")